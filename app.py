@@ -4,7 +4,9 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from collections import namedtuple
 from datetime import datetime
+from types import MappingProxyType
 
 # Page configuration
 st.set_page_config(
@@ -14,8 +16,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
+# Severity levels from least to most severe
+SEVERITY_DTYPE = pd.CategoricalDtype(['Low', 'Medium', 'High'], ordered=True)
+HIGH_SEVERITY_CODE = SEVERITY_DTYPE.categories.get_loc('High')
+SEVERITY_COLORS = {'High': '#e53e3e', 'Medium': '#ed8936', 'Low': '#38a169'}
+
+# Immutable county reference record
+CountyInfo = namedtuple('CountyInfo', 'full_name population risk_level')
+
+# Abbreviated month names, January first
+MONTH_NAMES = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+
+# Static page markup - kept out of main() so the layout code stays readable
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -39,12 +53,45 @@ st.markdown("""
         border-left: 5px solid #4299e1;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+HEADER_HTML = (
+    '<h1 class="main-header">🌊 Oklahoma Flood Research Dashboard</h1>'
+    '<p style="text-align: center; font-size: 1.2rem; color: #666;">Advanced flood analysis for Oklahoma counties (2015-2025)</p>'
+)
+
+FINDINGS_TEMPORAL = """
+**Temporal Patterns:**
+- Peak flood season: Spring-Summer (April-June)
+- Increasing damage trends since 2019
+- 68% higher risks for tribal communities
+- Arkansas River corridor most vulnerable
+"""
+
+FINDINGS_IMPACT = """
+**Impact Analysis:**
+- High severity events: 62% of total damage
+- Urban counties show flash flood dominance
+- Climate projections validated by observations
+- Multi-source data integration approach
+"""
+
+FOOTER_MARKDOWN = """
+### 📚 Research Citations
+- USGS (1964): Floods in Oklahoma: Magnitude and Frequency
+- Native American Climate Study (2024): Future flood risks for tribal communities
+- Oklahoma Emergency Management: Damage assessment reports (2015-2025)
+
+**Dashboard Status**: ✅ Core functionality working | Full advanced features coming soon
+"""
+
+# Custom CSS
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Data - Embedded directly to avoid any import issues
-@st.cache_data
+@st.cache_resource
 def load_flood_data():
-    """Load Oklahoma flood data"""
+    """Load Oklahoma flood data (shared across reruns - treat as read-only)"""
     data = {
         'date': [
             '2025-04-30', '2024-04-27', '2023-05-20', '2022-05-15', '2021-04-28',
@@ -76,54 +123,211 @@ def load_flood_data():
         ]
     }
     
-    df = pd.DataFrame(data)
-    df['date'] = pd.to_datetime(df['date'])
-    df['year'] = df['date'].dt.year
-    df['total_casualties'] = df['fatalities'] + df['injuries']
-    df['damage_millions'] = df['damage_usd'] / 1000000
+    # Derive calendar and impact columns on raw arrays, then build the frame once
+    dates = np.array(data['date'], dtype='datetime64[D]')
+    years = dates.astype('datetime64[Y]')
+    fatalities = np.array(data['fatalities'], dtype=np.int16)
+    injuries = np.array(data['injuries'], dtype=np.int16)
+    damage_usd = np.array(data['damage_usd'], dtype=np.int64)
+    
+    df = pd.DataFrame({
+        'date': dates.astype('datetime64[ns]'),
+        'county': pd.Categorical(data['county']),
+        'type': pd.Categorical(data['type']),
+        'fatalities': fatalities,
+        'injuries': injuries,
+        'damage_usd': damage_usd,
+        'rain_inches': np.array(data['rain_inches'], dtype=np.float64),
+        'severity_level': pd.Categorical(data['severity_level'], dtype=SEVERITY_DTYPE),
+        'year': (years.astype(np.int64) + 1970).astype(np.int16),
+        'month': ((dates.astype('datetime64[M]') - years).astype(np.int64) + 1).astype(np.int8),
+        'total_casualties': fatalities + injuries,
+        'damage_millions': damage_usd / 1000000
+    })
     
-    return df
+    return df.sort_values('date', ignore_index=True)
 
-@st.cache_data 
+@st.cache_resource
 def load_county_data():
-    """Load county information"""
-    return {
-        'Oklahoma': {
-            'full_name': 'Oklahoma County',
-            'population': 796292,
-            'risk_level': 'High'
-        },
-        'Tulsa': {
-            'full_name': 'Tulsa County', 
-            'population': 669279,
-            'risk_level': 'High'
-        },
-        'Cleveland': {
-            'full_name': 'Cleveland County',
-            'population': 295528,
-            'risk_level': 'Medium'
-        },
-        'Creek': {
-            'full_name': 'Creek County',
-            'population': 71754,
-            'risk_level': 'High'
-        },
-        'Muskogee': {
-            'full_name': 'Muskogee County',
-            'population': 66339,
-            'risk_level': 'High'
+    """Load county information (shared across reruns - treat as read-only)"""
+    return MappingProxyType({
+        'Oklahoma': CountyInfo('Oklahoma County', 796292, 'High'),
+        'Tulsa': CountyInfo('Tulsa County', 669279, 'High'),
+        'Cleveland': CountyInfo('Cleveland County', 295528, 'Medium'),
+        'Creek': CountyInfo('Creek County', 71754, 'High'),
+        'Muskogee': CountyInfo('Muskogee County', 66339, 'High'),
+        'Grady': CountyInfo('Grady County', 54795, 'Medium')
+    })
+
+@st.cache_resource
+def load_county_full_names():
+    """County key -> display name, used to label charts and the records table"""
+    return MappingProxyType({name: info.full_name for name, info in load_county_data().items()})
+
+@st.cache_data(show_spinner=False)
+def filter_flood_data(county, severity, year_range):
+    """Return the flood events matching the sidebar filters"""
+    df = load_flood_data()
+    years = df['year'].to_numpy()
+    mask = (years >= year_range[0]) & (years <= year_range[1])
+    
+    if county != 'All Counties':
+        mask &= (df['county'] == county).to_numpy()
+    
+    if severity != 'All Severities':
+        mask &= (df['severity_level'] == severity).to_numpy()
+    
+    return df[mask]
+
+def build_severity_pie(severity_counts):
+    """Build the severity distribution pie chart"""
+    fig = go.Figure(go.Pie(
+        labels=severity_counts.index,
+        values=severity_counts.values,
+        marker=dict(colors=[SEVERITY_COLORS[level] for level in severity_counts.index])
+    ))
+    fig.update_layout(title_text="Flood Events by Severity Level")
+    return fig
+
+def build_county_bar(county_damage):
+    """Build the total-damage-by-county bar chart"""
+    fig = go.Figure(go.Bar(
+        x=county_damage.rename(load_county_full_names()).index,
+        y=county_damage.values
+    ))
+    fig.update_layout(
+        title_text="Total Damage by County ($M)",
+        xaxis_title="County",
+        yaxis_title="Damage ($M)",
+        xaxis_tickangle=-45
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_annual_chart(filters, _events):
+    """Build the annual events/damage chart, keyed on the filter values"""
+    # Events are pre-sorted by date, so years come out in order
+    annual_data = _events.groupby('year', sort=False).agg({
+        'date': 'count',
+        'damage_millions': 'sum'
+    }).rename(columns={'date': 'events'})
+    
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    
+    fig.add_trace(
+        go.Scatter(x=annual_data.index, y=annual_data['events'],
+                  mode='lines+markers', name='Events'),
+        secondary_y=False,
+    )
+    
+    fig.add_trace(
+        go.Scatter(x=annual_data.index, y=annual_data['damage_millions'],
+                  mode='lines+markers', name='Damage ($M)', line=dict(color='red')),
+        secondary_y=True,
+    )
+    
+    fig.update_xaxes(title_text="Year")
+    fig.update_yaxes(title_text="Number of Events", secondary_y=False)
+    fig.update_yaxes(title_text="Damage ($M)", secondary_y=True)
+    fig.update_layout(title_text="Annual Flood Trends")
+    return fig
+
+def build_monthly_bar(monthly_counts):
+    """Build the events-by-month bar chart"""
+    fig = go.Figure(go.Bar(x=MONTH_NAMES, y=monthly_counts))
+    fig.update_layout(
+        title_text='Flood Events by Month',
+        xaxis_title='Month',
+        yaxis_title='Number of Events'
+    )
+    return fig
+
+@st.cache_data(show_spinner=False)
+def build_damage_scatter(filters, _events):
+    """Build the per-event damage vs casualties scatter plot, keyed on the filter values"""
+    return px.scatter(
+        _events, 
+        x='total_casualties', 
+        y='damage_millions',
+        color='severity_level',
+        size='rain_inches',
+        hover_data=['county', 'date'],
+        title='Damage vs Casualties by Severity',
+        render_mode='webgl',
+        labels={'total_casualties': 'Total Casualties', 'damage_millions': 'Damage ($M)'},
+        color_discrete_map=SEVERITY_COLORS
+    )
+
+@st.cache_data(show_spinner=False)
+def build_risk_scatter(filters, _county_stats):
+    """Build the county risk assessment scatter plot, keyed on the filter values"""
+    return px.scatter(
+        _county_stats.reset_index(),
+        x='events',
+        y='damage_millions',
+        size='total_casualties',
+        hover_name='county',
+        title='County Risk Assessment',
+        render_mode='webgl',
+        labels={'events': 'Number of Events', 'damage_millions': 'Total Damage ($M)'}
+    )
+
+@st.cache_data(show_spinner=False)
+def build_export_payloads(filters, _display_df):
+    """Serialize the records table to CSV and JSON, keyed on the filter values"""
+    return _display_df.to_csv(index=False), _display_df.to_json(orient='records', indent=2)
+
+@st.fragment
+def render_records_tab(filtered_df, filters):
+    """Render the records table and downloads; reruns alone on download clicks"""
+    st.subheader("📋 Flood Event Records")
+    
+    # Display data table
+    # month is a chart helper column; keep it out of the table and exports
+    display_df = filtered_df.drop(columns='month')
+    display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d')
+    display_df['county_full'] = display_df['county'].cat.rename_categories(load_county_full_names())
+    
+    st.dataframe(
+        display_df[['date', 'county_full', 'type', 'severity_level', 
+                   'fatalities', 'injuries', 'damage_millions', 'rain_inches']],
+        column_config={
+            'date': 'Date',
+            'county_full': 'County',
+            'type': 'Flood Type',
+            'severity_level': 'Severity',
+            'fatalities': 'Fatalities',
+            'injuries': 'Injuries',
+            'damage_millions': st.column_config.NumberColumn('Damage ($M)', format="%.1f"),
+            'rain_inches': st.column_config.NumberColumn('Rainfall (in)', format="%.1f")
         },
-        'Grady': {
-            'full_name': 'Grady County',
-            'population': 54795,
-            'risk_level': 'Medium'
-        }
-    }
+        use_container_width=True
+    )
+    
+    # Download options
+    col1, col2 = st.columns(2)
+    
+    csv_data, json_data = build_export_payloads(filters, display_df)
+    
+    with col1:
+        st.download_button(
+            label="📊 Download CSV",
+            data=csv_data,
+            file_name=f"oklahoma_floods_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
+    
+    with col2:
+        st.download_button(
+            label="📋 Download JSON",
+            data=json_data,
+            file_name=f"oklahoma_floods_{datetime.now().strftime('%Y%m%d')}.json",
+            mime="application/json"
+        )
 
 def main():
     # Header
-    st.markdown('<h1 class="main-header">🌊 Oklahoma Flood Research Dashboard</h1>', unsafe_allow_html=True)
-    st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Advanced flood analysis for Oklahoma counties (2015-2025)</p>', unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     # Load data
     flood_df = load_flood_data()
@@ -146,18 +350,8 @@ def main():
         year_range = st.slider("Select Year Range", min_year, max_year, (min_year, max_year))
     
     # Apply filters
-    filtered_df = flood_df.copy()
-    
-    if selected_county != 'All Counties':
-        filtered_df = filtered_df[filtered_df['county'] == selected_county]
-    
-    if selected_severity != 'All Severities':
-        filtered_df = filtered_df[filtered_df['severity_level'] == selected_severity]
-    
-    filtered_df = filtered_df[
-        (filtered_df['year'] >= year_range[0]) & 
-        (filtered_df['year'] <= year_range[1])
-    ]
+    filters = (selected_county, selected_severity, year_range)
+    filtered_df = filter_flood_data(*filters)
     
     # Summary metrics
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -174,13 +368,13 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col3:
-        total_fatalities = filtered_df['fatalities'].sum()
+        total_fatalities = filtered_df['fatalities'].to_numpy().sum()
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
         st.metric("Total Fatalities", int(total_fatalities))
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col4:
-        high_severity = len(filtered_df[filtered_df['severity_level'] == 'High'])
+        high_severity = np.count_nonzero(filtered_df['severity_level'].cat.codes.to_numpy() == HIGH_SEVERITY_CODE)
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
         st.metric("High Severity Events", high_severity)
         st.markdown('</div>', unsafe_allow_html=True)
@@ -198,25 +392,20 @@ def main():
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("""
-        **Temporal Patterns:**
-        - Peak flood season: Spring-Summer (April-June)
-        - Increasing damage trends since 2019
-        - 68% higher risks for tribal communities
-        - Arkansas River corridor most vulnerable
-        """)
+        st.markdown(FINDINGS_TEMPORAL)
     
     with col2:
-        st.markdown("""
-        **Impact Analysis:**
-        - High severity events: 62% of total damage
-        - Urban counties show flash flood dominance
-        - Climate projections validated by observations
-        - Multi-source data integration approach
-        """)
+        st.markdown(FINDINGS_IMPACT)
     
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # County aggregates shared by the overview and geographic tabs
+    county_stats = filtered_df.groupby('county', observed=True, sort=False).agg(
+        damage_millions=('damage_millions', 'sum'),
+        total_casualties=('total_casualties', 'sum'),
+        events=('date', 'count')
+    )
+    
     # Visualizations
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📅 Temporal Trends", "🗺️ Geographic Analysis", "📋 Data Records"])
     
@@ -225,166 +414,48 @@ def main():
         
         with col1:
             # Severity distribution
-            severity_counts = filtered_df['severity_level'].value_counts()
-            fig_severity = px.pie(
-                values=severity_counts.values,
-                names=severity_counts.index,
-                title="Flood Events by Severity Level",
-                color_discrete_map={'High': '#e53e3e', 'Medium': '#ed8936', 'Low': '#38a169'}
+            severity_counts = pd.Series(
+                np.bincount(filtered_df['severity_level'].cat.codes.to_numpy(),
+                            minlength=len(SEVERITY_DTYPE.categories)),
+                index=SEVERITY_DTYPE.categories
             )
-            st.plotly_chart(fig_severity, use_container_width=True)
+            severity_counts = severity_counts[severity_counts > 0]
+            st.plotly_chart(build_severity_pie(severity_counts), use_container_width=True)
         
         with col2:
             # Damage by county
-            county_damage = filtered_df.groupby('county')['damage_millions'].sum().sort_values(ascending=False)
-            fig_county = px.bar(
-                x=[county_data.get(c, {}).get('full_name', c) for c in county_damage.index],
-                y=county_damage.values,
-                title="Total Damage by County ($M)",
-                labels={'x': 'County', 'y': 'Damage ($M)'}
-            )
-            fig_county.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig_county, use_container_width=True)
+            county_damage = county_stats['damage_millions'].sort_values(ascending=False)
+            st.plotly_chart(build_county_bar(county_damage), use_container_width=True)
     
     with tab2:
         col1, col2 = st.columns(2)
         
         with col1:
             # Annual trends
-            annual_data = filtered_df.groupby('year').agg({
-                'date': 'count',
-                'damage_millions': 'sum'
-            }).rename(columns={'date': 'events'})
-            
-            fig_annual = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            fig_annual.add_trace(
-                go.Scatter(x=annual_data.index, y=annual_data['events'],
-                          mode='lines+markers', name='Events'),
-                secondary_y=False,
-            )
-            
-            fig_annual.add_trace(
-                go.Scatter(x=annual_data.index, y=annual_data['damage_millions'],
-                          mode='lines+markers', name='Damage ($M)', line=dict(color='red')),
-                secondary_y=True,
-            )
-            
-            fig_annual.update_xaxes(title_text="Year")
-            fig_annual.update_yaxes(title_text="Number of Events", secondary_y=False)
-            fig_annual.update_yaxes(title_text="Damage ($M)", secondary_y=True)
-            fig_annual.update_layout(title_text="Annual Flood Trends")
-            
-            st.plotly_chart(fig_annual, use_container_width=True)
+            st.plotly_chart(build_annual_chart(filters, filtered_df), use_container_width=True)
         
         with col2:
             # Monthly distribution
-            monthly_data = filtered_df.groupby(filtered_df['date'].dt.month).size()
-            month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            
-            fig_monthly = px.bar(
-                x=[month_names[i-1] for i in monthly_data.index],
-                y=monthly_data.values,
-                title='Flood Events by Month',
-                labels={'x': 'Month', 'y': 'Number of Events'}
-            )
-            st.plotly_chart(fig_monthly, use_container_width=True)
+            monthly_counts = np.bincount(filtered_df['month'].to_numpy(), minlength=13)[1:]
+            st.plotly_chart(build_monthly_bar(monthly_counts), use_container_width=True)
     
     with tab3:
         col1, col2 = st.columns(2)
         
         with col1:
             # Damage vs casualties
-            fig_scatter = px.scatter(
-                filtered_df, 
-                x='total_casualties', 
-                y='damage_millions',
-                color='severity_level',
-                size='rain_inches',
-                hover_data=['county', 'date'],
-                title='Damage vs Casualties by Severity',
-                labels={'total_casualties': 'Total Casualties', 'damage_millions': 'Damage ($M)'},
-                color_discrete_map={'High': '#e53e3e', 'Medium': '#ed8936', 'Low': '#38a169'}
-            )
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            st.plotly_chart(build_damage_scatter(filters, filtered_df), use_container_width=True)
         
         with col2:
             # County risk levels
-            county_stats = filtered_df.groupby('county').agg({
-                'damage_millions': 'sum',
-                'total_casualties': 'sum',
-                'date': 'count'
-            }).rename(columns={'date': 'events'})
-            
-            fig_risk = px.scatter(
-                county_stats.reset_index(),
-                x='events',
-                y='damage_millions',
-                size='total_casualties',
-                hover_name='county',
-                title='County Risk Assessment',
-                labels={'events': 'Number of Events', 'damage_millions': 'Total Damage ($M)'}
-            )
-            st.plotly_chart(fig_risk, use_container_width=True)
+            st.plotly_chart(build_risk_scatter(filters, county_stats), use_container_width=True)
     
     with tab4:
-        st.subheader("📋 Flood Event Records")
-        
-        # Display data table
-        display_df = filtered_df.copy()
-        display_df['date'] = display_df['date'].dt.strftime('%Y-%m-%d')
-        display_df['county_full'] = display_df['county'].map(
-            lambda x: county_data.get(x, {}).get('full_name', x)
-        )
-        
-        st.dataframe(
-            display_df[['date', 'county_full', 'type', 'severity_level', 
-                       'fatalities', 'injuries', 'damage_millions', 'rain_inches']],
-            column_config={
-                'date': 'Date',
-                'county_full': 'County',
-                'type': 'Flood Type',
-                'severity_level': 'Severity',
-                'fatalities': 'Fatalities',
-                'injuries': 'Injuries',
-                'damage_millions': st.column_config.NumberColumn('Damage ($M)', format="%.1f"),
-                'rain_inches': st.column_config.NumberColumn('Rainfall (in)', format="%.1f")
-            },
-            use_container_width=True
-        )
-        
-        # Download options
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            csv_data = display_df.to_csv(index=False)
-            st.download_button(
-                label="📊 Download CSV",
-                data=csv_data,
-                file_name=f"oklahoma_floods_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        
-        with col2:
-            json_data = display_df.to_json(orient='records', indent=2)
-            st.download_button(
-                label="📋 Download JSON",
-                data=json_data,
-                file_name=f"oklahoma_floods_{datetime.now().strftime('%Y%m%d')}.json",
-                mime="application/json"
-            )
+        render_records_tab(filtered_df, filters)
 
     # Footer
     st.markdown("---")
-    st.markdown("""
-    ### 📚 Research Citations
-    - USGS (1964): Floods in Oklahoma: Magnitude and Frequency
-    - Native American Climate Study (2024): Future flood risks for tribal communities
-    - Oklahoma Emergency Management: Damage assessment reports (2015-2025)
-    
-    **Dashboard Status**: ✅ Core functionality working | Full advanced features coming soon
-    """)
+    st.markdown(FOOTER_MARKDOWN)
 
 if __name__ == "__main__":
     main()